@@ -1,4 +1,14 @@
-"""Alembic environment script."""
+"""Alembic environment script.
+
+Migrates every shard in settings.shard_urls; pass `-x shard=<name>` to target one.
+Offline mode (`--sql`) emits one script per run, so it requires `-x shard=<name>`.
+
+All shards share one migration history, so `tenant_shards` is created on every
+shard. Only the default shard's copy is read or written (app.core.sharding);
+the copies on other shards stay empty. Run autogenerate against the default
+shard.
+"""
+import logging
 from logging.config import fileConfig
 from pathlib import Path
 
@@ -24,16 +34,29 @@ sys.path.append(str(Path(__file__).resolve().parents[1] / "app"))
 
 settings = get_settings()
 
-# set sqlalchemy.url from env (allows overriding)
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
-
 # provide metadata object for "autogenerate" support
 target_metadata = Base.metadata
 
 
-def run_migrations_offline() -> None:
+logger = logging.getLogger("alembic.env")
+
+
+def target_shards() -> dict[str, str]:
+    shards = settings.shard_urls
+    selected = context.get_x_argument(as_dictionary=True).get("shard")
+    if selected is None:
+        if context.is_offline_mode():
+            raise ValueError(
+                f"Offline mode needs one shard per script: pass -x shard=<name> ({', '.join(shards)})"
+            )
+        return shards
+    if selected not in shards:
+        raise ValueError(f"Unknown shard {selected!r}; configured: {', '.join(shards)}")
+    return {selected: shards[selected]}
+
+
+def run_migrations_offline(url: str) -> None:
     """Run migrations in 'offline' mode."""
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -46,8 +69,10 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
-def run_migrations_online() -> None:
+def run_migrations_online(url: str) -> None:
     """Run migrations in 'online' mode."""
+    # set sqlalchemy.url per shard (allows overriding from env)
+    config.set_main_option("sqlalchemy.url", url)
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -65,7 +90,9 @@ def run_migrations_online() -> None:
             context.run_migrations()
 
 
-if context.is_offline_mode():
-    run_migrations_offline()
-else:
-    run_migrations_online()
+for shard, shard_url in target_shards().items():
+    logger.info("Migrating shard %r", shard)
+    if context.is_offline_mode():
+        run_migrations_offline(shard_url)
+    else:
+        run_migrations_online(shard_url)
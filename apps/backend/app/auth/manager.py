@@ -1,26 +1,99 @@
 """Custom FastAPI-Users UserManager with tenant context."""
 from uuid import UUID
 
-from fastapi import Depends, Request
+from fastapi import Depends, HTTPException, Request, status
 from fastapi_users import BaseUserManager, IntegerIDMixin, exceptions, models
 from fastapi_users.db import SQLAlchemyUserDatabase
+from sqlalchemy import func, select
+from sqlalchemy.exc import MultipleResultsFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import get_password_hash
 from app.core.database import get_db
+from app.core.config import get_settings
+from app.core.sharding import TenantMovingError, route_session, shard_directory, shard_registry
 from app.models.models import User
 
 SECRET = "change_me"  # overridden by settings
+settings = get_settings()
+
+
+def tenant_moving_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Tenant migration in progress",
+        headers={"Retry-After": str(settings.SHARD_DIRECTORY_CACHE_SECONDS)},
+    )
+
+
+async def route_user_session(session: AsyncSession, tenant_id: UUID) -> None:
+    """Route the request session to the tenant's shard (503 while it is being moved)."""
+    try:
+        await route_session(session, tenant_id)
+    except TenantMovingError:
+        raise tenant_moving_error()
+
+
+class TenantUserDatabase(SQLAlchemyUserDatabase):
+    """User store that routes its session to the user's tenant shard.
+
+    Login carries no tenant, so `get_by_email` queries every shard in turn
+    (one round-trip per shard). A match only counts on the shard the directory
+    names for its tenant, so copies left behind by a tenant move are ignored;
+    users without a tenant live on the default shard. If the email belongs to
+    more than one tenant the lookup fails, as the single-database one would.
+    """
+
+    async def _tenants_with_email(self, shard: str, email: str) -> list[UUID | None]:
+        async with shard_registry.sessionmaker(shard)() as session:
+            result = await session.execute(
+                select(User.tenant_id).where(func.lower(User.email) == func.lower(email)).distinct()
+            )
+            return list(result.scalars())
+
+    async def _home_shard(self, tenant_id: UUID | None) -> str:
+        if tenant_id is None:
+            return shard_registry.default
+        shard, _ = await shard_directory.lookup(tenant_id)
+        return shard
+
+    async def get_by_email(self, email: str) -> User | None:
+        if "shard" in self.session.info:
+            return await super().get_by_email(email)
+
+        matches: set[UUID | None] = set()
+        for shard in shard_registry.names():
+            for tenant_id in await self._tenants_with_email(shard, email):
+                if await self._home_shard(tenant_id) == shard:
+                    matches.add(tenant_id)
+        if len(matches) > 1:
+            raise MultipleResultsFound(f"Email {email!r} exists in {len(matches)} tenants")
+        if not matches:
+            return None
+
+        tenant_id = matches.pop()
+        if tenant_id is None:
+            tenant_clause = User.tenant_id.is_(None)
+        else:
+            await route_user_session(self.session, tenant_id)
+            tenant_clause = User.tenant_id == tenant_id
+        statement = select(User).where(func.lower(User.email) == func.lower(email), tenant_clause)
+        return await self._get_user(statement)
 
 
 async def get_user_db(session: AsyncSession = Depends(get_db)):
-    yield SQLAlchemyUserDatabase(session, User)
+    yield TenantUserDatabase(session, User)
 
 
 class UserManager(IntegerIDMixin, BaseUserManager[User, UUID]):
     reset_password_token_secret = SECRET
     verification_token_secret = SECRET
 
+    async def create(self, user_create, safe: bool = False, request: Request | None = None) -> User:  # type: ignore[override]
+        if getattr(user_create, "tenant_id", None) is not None:
+            await route_user_session(self.user_db.session, user_create.tenant_id)
+        return await super().create(user_create, safe, request)
+
     async def on_after_register(self, user: User, request: Request | None = None):
         # Could send email or logging
         pass
@@ -1,17 +1,28 @@
 """Application settings using Pydantic v2.
 Environment variables override the defaults. These settings are imported
 across the application (database, Celery, security, storage)."""
+import re
 from functools import lru_cache
 from typing import Literal
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+SHARD_NAME_RE = re.compile(r"^[a-z0-9_]{1,63}$")  # fits tenant_shards.shard
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     # ───────────────────────────── Database
     DATABASE_URL: str = "postgresql+asyncpg://dev:devpass@db:5432/amm"
+    # Extra shards as JSON, e.g. {"shard1": "postgresql+asyncpg://dev:devpass@db:5432/amm_shard1"}.
+    # DATABASE_URL is always the default shard and hosts the tenant → shard directory.
+    SHARD_DATABASE_URLS: dict[str, str] = {}
+    DEFAULT_SHARD: str = "default"
+    SHARD_DIRECTORY_CACHE_SECONDS: int = 60
+    # Shorter TTL for tenants flagged `moving`, so cut-over is picked up quickly.
+    SHARD_DIRECTORY_MOVING_CACHE_SECONDS: int = 2
 
     # ───────────────────────────── Security
     JWT_SECRET: str = "supersecretchange"
@@ -32,6 +43,22 @@ class Settings(BaseSettings):
     # ───────────────────────────── Environment
     ENVIRONMENT: Literal["local", "test", "production"] = "local"
 
+    @model_validator(mode="after")
+    def check_shards(self) -> "Settings":
+        for name in (self.DEFAULT_SHARD, *self.SHARD_DATABASE_URLS):
+            if not SHARD_NAME_RE.match(name):
+                raise ValueError(f"Invalid shard name {name!r}: use 1-63 chars of [a-z0-9_]")
+        if self.DEFAULT_SHARD in self.SHARD_DATABASE_URLS:
+            raise ValueError(
+                f"SHARD_DATABASE_URLS must not contain the default shard {self.DEFAULT_SHARD!r}; "
+                "set its URL through DATABASE_URL"
+            )
+        return self
+
+    @property
+    def shard_urls(self) -> dict[str, str]:
+        return {self.DEFAULT_SHARD: self.DATABASE_URL, **self.SHARD_DATABASE_URLS}
+
     @property
     def broker_url(self) -> str:
         return self.CELERY_BROKER_URL or self.REDIS_URL
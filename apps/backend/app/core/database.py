@@ -1,4 +1,4 @@
-"""Database utilities: async engine & session factory."""
+"""Database utilities: async engine & session factory for the default shard."""
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base
 
@@ -13,5 +13,7 @@ Base = declarative_base()
 
 
 async def get_db() -> AsyncSession:  # Dependency
+    # Starts on the default shard; authentication re-routes this (request-cached)
+    # session to the user's tenant shard before any query (see app.core.sharding).
     async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,142 @@
+"""Tenant-aware sharding: shard engines, tenant → shard directory, session routing.
+
+Each shard is a full copy of the schema; a tenant's rows all live on one shard.
+The directory (`tenant_shards`) lives on the default shard and is cached
+in-process for SHARD_DIRECTORY_CACHE_SECONDS, so a tenant move must wait at
+least that long after flagging the tenant before copying (see
+scripts/move_tenant.py). Entries of tenants being moved are cached for only
+SHARD_DIRECTORY_MOVING_CACHE_SECONDS so the cut-over is picked up quickly.
+
+A tenant's rows may briefly exist on two shards (copied but not yet purged,
+or kept with --keep-source); every lookup goes through the directory, so
+the copy on the shard the directory does not name is never served.
+"""
+import time
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from .config import get_settings
+from .database import AsyncSessionLocal, engine
+from app.models.models import TenantShard, TenantShardStatusEnum
+
+settings = get_settings()
+
+
+class TenantMovingError(RuntimeError):
+    """Raised while a tenant is being copied to another shard."""
+
+
+# ───────────── Engines
+
+class ShardRegistry:
+    """Lazily creates one async engine (and session factory) per shard."""
+
+    def __init__(self, urls: dict[str, str], default: str, default_engine: AsyncEngine):
+        self._urls = urls
+        self.default = default
+        self._engines: dict[str, AsyncEngine] = {default: default_engine}
+        self._sessionmakers: dict[str, async_sessionmaker[AsyncSession]] = {}
+
+    def names(self) -> list[str]:
+        return list(self._urls)
+
+    def engine(self, name: str) -> AsyncEngine:
+        if name not in self._engines:
+            if name not in self._urls:
+                raise ValueError(f"Unknown shard {name!r}")
+            self._engines[name] = create_async_engine(self._urls[name], echo=False, pool_pre_ping=True)
+        return self._engines[name]
+
+    def sessionmaker(self, name: str) -> async_sessionmaker[AsyncSession]:
+        if name not in self._sessionmakers:
+            self._sessionmakers[name] = async_sessionmaker(
+                bind=self.engine(name), expire_on_commit=False, class_=AsyncSession
+            )
+        return self._sessionmakers[name]
+
+    async def dispose(self) -> None:
+        for shard_engine in self._engines.values():
+            await shard_engine.dispose()
+
+
+# ───────────── Directory
+
+class ShardDirectory:
+    """Tenant → shard lookups backed by `tenant_shards`, with a TTL cache."""
+
+    def __init__(self, ttl_seconds: float, moving_ttl_seconds: float, default_shard: str):
+        self._ttl = ttl_seconds
+        self._moving_ttl = moving_ttl_seconds
+        self._default = default_shard
+        self._cache: dict[UUID, tuple[float, str, TenantShardStatusEnum]] = {}
+
+    async def lookup(self, tenant_id: UUID, use_cache: bool = True) -> tuple[str, TenantShardStatusEnum]:
+        now = time.monotonic()
+        cached = self._cache.get(tenant_id)
+        if use_cache and cached is not None and cached[0] > now:
+            return cached[1], cached[2]
+
+        shard, status = await self._fetch(tenant_id)
+        ttl = self._ttl if status is TenantShardStatusEnum.active else self._moving_ttl
+        self._cache[tenant_id] = (now + ttl, shard, status)
+        return shard, status
+
+    async def _fetch(self, tenant_id: UUID) -> tuple[str, TenantShardStatusEnum]:
+        async with AsyncSessionLocal() as session:
+            entry = await session.get(TenantShard, tenant_id)
+        if entry is None:
+            return self._default, TenantShardStatusEnum.active
+        return entry.shard, entry.status
+
+    async def shard_for(self, tenant_id: UUID) -> str:
+        shard, status = await self.lookup(tenant_id)
+        if status is not TenantShardStatusEnum.active:
+            raise TenantMovingError(f"Tenant {tenant_id} is being moved off shard {shard!r}")
+        return shard
+
+    async def assign(
+        self,
+        tenant_id: UUID,
+        shard: str,
+        status: TenantShardStatusEnum = TenantShardStatusEnum.active,
+    ) -> None:
+        values = {"shard": shard, "status": status, "updated_at": datetime.utcnow()}
+        stmt = pg_insert(TenantShard).values(tenant_id=tenant_id, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[TenantShard.tenant_id], set_=values)
+        async with AsyncSessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+        self.invalidate(tenant_id)
+
+    def invalidate(self, tenant_id: UUID | None = None) -> None:
+        if tenant_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(tenant_id, None)
+
+
+shard_registry = ShardRegistry(settings.shard_urls, settings.DEFAULT_SHARD, engine)
+shard_directory = ShardDirectory(
+    settings.SHARD_DIRECTORY_CACHE_SECONDS,
+    settings.SHARD_DIRECTORY_MOVING_CACHE_SECONDS,
+    settings.DEFAULT_SHARD,
+)
+
+
+# ───────────── Session routing
+
+async def route_session(session: AsyncSession, tenant_id: UUID) -> str:
+    """Point an unused session at the shard holding `tenant_id`."""
+    shard = await shard_directory.shard_for(tenant_id)
+    if session.info.get("shard") == shard:
+        return shard
+    if session.in_transaction():
+        raise RuntimeError("Cannot re-route a session that already started a transaction")
+    target = shard_registry.engine(shard)
+    session.bind = target
+    session.sync_session.bind = target.sync_engine
+    session.info["shard"] = shard
+    return shard
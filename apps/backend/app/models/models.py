@@ -52,6 +52,31 @@ class Role(Base):
 Tenant.roles = relationship("Role", back_populates="tenant", cascade="all, delete-orphan")  # type: ignore
 
 
+class TenantShardStatusEnum(str, PyEnum):
+    active = "active"
+    moving = "moving"
+
+
+class TenantShard(Base):
+    """Tenant → shard directory entry.
+
+    Only the copy on the default shard (DATABASE_URL) is authoritative; tenants
+    without an entry live on the default shard. No FK to tenants since the
+    tenant row itself may live on another shard.
+    """
+
+    __tablename__ = "tenant_shards"
+
+    tenant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    shard: Mapped[str] = mapped_column(String(63), nullable=False)
+    status: Mapped[TenantShardStatusEnum] = mapped_column(SAEnum(
+        TenantShardStatusEnum,
+        name="tenant_shard_status_enum",
+        values_callable=lambda enum_cls: [e.value for e in enum_cls],
+    ), default=TenantShardStatusEnum.active)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Permission(Base):
     __tablename__ = "permissions"
 
@@ -1,17 +1,20 @@
 """Authentication routes using fastapi-users with JWT."""
 from uuid import UUID
 
+import jwt
 from fastapi import APIRouter
-from fastapi_users import FastAPIUsers
+from fastapi_users import BaseUserManager, FastAPIUsers
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy,
 )
+from fastapi_users.jwt import decode_jwt, generate_jwt
 
-from app.auth.manager import get_user_manager
+from app.auth.manager import get_user_manager, route_user_session, tenant_moving_error
 from app.models.models import User
 from app.core.config import get_settings
+from app.core.sharding import TenantMovingError, shard_directory
 
 settings = get_settings()
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -21,8 +24,43 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 bearer_transport = BearerTransport(tokenUrl="/auth/jwt/login")
 
 
+class TenantJWTStrategy(JWTStrategy[User, UUID]):
+    """JWT carrying the tenant id (`tid`) so the request session can be routed
+    to the tenant's shard before the user is loaded."""
+
+    async def write_token(self, user: User) -> str:
+        data = {"sub": str(user.id), "aud": self.token_audience}
+        if user.tenant_id is not None:
+            data["tid"] = str(user.tenant_id)
+        return generate_jwt(data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm)
+
+    async def read_token(self, token: str | None, user_manager: BaseUserManager[User, UUID]) -> User | None:
+        if token is None:
+            return None
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience, algorithms=[self.algorithm])
+            tenant_id = UUID(data["tid"]) if "tid" in data else None
+        except (jwt.PyJWTError, ValueError):
+            return None
+        if tenant_id is not None:
+            await route_user_session(user_manager.user_db.session, tenant_id)
+            return await super().read_token(token, user_manager)
+
+        # No `tid`: a user without a tenant, or a token issued before sharding.
+        # Such users are loaded from the default shard, so only accept them
+        # while the directory still places their tenant there.
+        user = await super().read_token(token, user_manager)
+        if user is None or user.tenant_id is None:
+            return user
+        try:
+            shard = await shard_directory.shard_for(user.tenant_id)
+        except TenantMovingError:
+            raise tenant_moving_error()
+        return user if shard == settings.DEFAULT_SHARD else None
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=settings.JWT_SECRET, lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    return TenantJWTStrategy(secret=settings.JWT_SECRET, lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 
 auth_backend = AuthenticationBackend(name="jwt", transport=bearer_transport, get_strategy=get_jwt_strategy)
@@ -0,0 +1,115 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.auth import manager
+from app.auth.manager import TenantUserDatabase
+from app.core.sharding import ShardRegistry, TenantMovingError
+from app.models.models import TenantShardStatusEnum, User
+
+ACTIVE, MOVING = TenantShardStatusEnum.active, TenantShardStatusEnum.moving
+TENANT_A, TENANT_B = uuid.uuid4(), uuid.uuid4()
+URLS = {"default": "postgresql+asyncpg://dev@localhost/amm", "shard1": "postgresql+asyncpg://dev@localhost/amm1"}
+
+
+class FakeDirectory:
+    def __init__(self, entries):
+        self.entries = entries
+
+    async def lookup(self, tenant_id, use_cache=True):
+        return self.entries.get(tenant_id, ("default", ACTIVE))
+
+
+class ScannedUserDatabase(TenantUserDatabase):
+    """Per-shard email matches come from a dict instead of the shards."""
+
+    def __init__(self, session, emails_by_shard):
+        super().__init__(session, User)
+        self.emails_by_shard = emails_by_shard
+        self.statements = []
+
+    async def _tenants_with_email(self, shard, email):
+        return self.emails_by_shard.get(shard, [])
+
+    async def _get_user(self, statement):
+        self.statements.append(statement)
+        return "user"
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    registry = ShardRegistry(URLS, "default", create_async_engine(URLS["default"]))
+    routes = []
+
+    async def fake_route_session(session, tenant_id):
+        routes.append(tenant_id)
+        return "shard1"
+
+    monkeypatch.setattr(manager, "shard_registry", registry)
+    monkeypatch.setattr(manager, "route_session", fake_route_session)
+    return registry, routes
+
+
+def scan(registry, emails_by_shard):
+    db = ScannedUserDatabase(AsyncSession(bind=registry.engine("default")), emails_by_shard)
+    return db, asyncio.run(db.get_by_email("a@lab.com"))
+
+
+def test_moved_tenant_with_copy_on_both_shards_logs_in(routed, monkeypatch):
+    registry, routes = routed
+    monkeypatch.setattr(manager, "shard_directory", FakeDirectory({TENANT_A: ("shard1", ACTIVE)}))
+    db, user = scan(registry, {"default": [TENANT_A], "shard1": [TENANT_A]})
+    assert user == "user"
+    assert routes == [TENANT_A]
+    assert len(db.statements) == 1
+
+
+def test_two_tenants_with_same_email_fail(routed, monkeypatch):
+    registry, routes = routed
+    monkeypatch.setattr(
+        manager, "shard_directory", FakeDirectory({TENANT_A: ("default", ACTIVE), TENANT_B: ("shard1", ACTIVE)})
+    )
+    with pytest.raises(MultipleResultsFound):
+        scan(registry, {"default": [TENANT_A], "shard1": [TENANT_B]})
+    assert routes == []
+
+
+def test_two_tenants_on_one_shard_fail(routed, monkeypatch):
+    registry, _ = routed
+    monkeypatch.setattr(manager, "shard_directory", FakeDirectory({}))
+    with pytest.raises(MultipleResultsFound):
+        scan(registry, {"default": [TENANT_A, TENANT_B]})
+
+
+def test_tenant_being_moved_gets_503(routed, monkeypatch):
+    registry, _ = routed
+    monkeypatch.setattr(manager, "shard_directory", FakeDirectory({TENANT_A: ("default", MOVING)}))
+
+    async def moving(session, tenant_id):
+        raise TenantMovingError("moving")
+
+    monkeypatch.setattr(manager, "route_session", moving)
+    with pytest.raises(HTTPException) as exc_info:
+        scan(registry, {"default": [TENANT_A], "shard1": [TENANT_A]})
+    assert exc_info.value.status_code == 503
+
+
+def test_user_without_tenant_stays_on_default_shard(routed, monkeypatch):
+    registry, routes = routed
+    monkeypatch.setattr(manager, "shard_directory", FakeDirectory({}))
+    db, user = scan(registry, {"default": [None]})
+    assert user == "user"
+    assert routes == []
+    assert "shard" not in db.session.info
+
+
+def test_unknown_email_returns_none(routed, monkeypatch):
+    registry, routes = routed
+    monkeypatch.setattr(manager, "shard_directory", FakeDirectory({}))
+    db, user = scan(registry, {})
+    assert user is None
+    assert routes == [] and db.statements == []
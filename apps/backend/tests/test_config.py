@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+
+
+def test_shard_urls_include_default_shard():
+    settings = Settings(DATABASE_URL="postgresql+asyncpg://a", SHARD_DATABASE_URLS={"shard1": "postgresql+asyncpg://b"})
+    assert settings.shard_urls == {"default": "postgresql+asyncpg://a", "shard1": "postgresql+asyncpg://b"}
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"SHARD_DATABASE_URLS": {"default": "postgresql+asyncpg://b"}},
+        {"DEFAULT_SHARD": "main", "SHARD_DATABASE_URLS": {"main": "postgresql+asyncpg://b"}},
+        {"SHARD_DATABASE_URLS": {"Shard-1": "postgresql+asyncpg://b"}},
+        {"DEFAULT_SHARD": ""},
+        {"DEFAULT_SHARD": "x" * 64},
+    ],
+)
+def test_invalid_shard_settings_are_rejected(overrides):
+    with pytest.raises(ValidationError):
+        Settings(**overrides)
@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import sharding
+from app.core.sharding import ShardDirectory, ShardRegistry, TenantMovingError, route_session
+from app.models.models import TenantShardStatusEnum
+
+ACTIVE, MOVING = TenantShardStatusEnum.active, TenantShardStatusEnum.moving
+TENANT = uuid.uuid4()
+
+
+class FakeDirectory(ShardDirectory):
+    """Directory whose backing table is a dict; counts table reads."""
+
+    def __init__(self, entries, ttl_seconds=60, moving_ttl_seconds=2):
+        super().__init__(ttl_seconds, moving_ttl_seconds, "default")
+        self.entries = entries
+        self.fetches = 0
+
+    async def _fetch(self, tenant_id):
+        self.fetches += 1
+        return self.entries.get(tenant_id, ("default", ACTIVE))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sharding.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lookup_is_cached_for_ttl(clock):
+    directory = FakeDirectory({TENANT: ("shard1", ACTIVE)})
+    assert asyncio.run(directory.lookup(TENANT)) == ("shard1", ACTIVE)
+    directory.entries[TENANT] = ("default", ACTIVE)
+    clock[0] += 59
+    assert asyncio.run(directory.lookup(TENANT)) == ("shard1", ACTIVE)
+    clock[0] += 2
+    assert asyncio.run(directory.lookup(TENANT)) == ("default", ACTIVE)
+    assert directory.fetches == 2
+
+
+def test_moving_entries_use_short_ttl(clock):
+    directory = FakeDirectory({TENANT: ("default", MOVING)})
+    with pytest.raises(TenantMovingError):
+        asyncio.run(directory.shard_for(TENANT))
+    directory.entries[TENANT] = ("shard1", ACTIVE)
+    clock[0] += 3
+    assert asyncio.run(directory.shard_for(TENANT)) == "shard1"
+
+
+def test_lookup_bypassing_cache_and_unknown_tenant(clock):
+    directory = FakeDirectory({})
+    assert asyncio.run(directory.lookup(TENANT)) == ("default", ACTIVE)
+    directory.entries[TENANT] = ("shard1", ACTIVE)
+    assert asyncio.run(directory.lookup(TENANT, use_cache=False)) == ("shard1", ACTIVE)
+    directory.invalidate(TENANT)
+    assert asyncio.run(directory.lookup(TENANT)) == ("shard1", ACTIVE)
+    assert directory.fetches == 3
+
+
+def test_registry_rejects_unknown_shard():
+    default_engine = create_async_engine("postgresql+asyncpg://dev@localhost/amm")
+    registry = ShardRegistry({"default": "postgresql+asyncpg://dev@localhost/amm"}, "default", default_engine)
+    assert registry.engine("default") is default_engine
+    with pytest.raises(ValueError):
+        registry.engine("nope")
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    urls = {"default": "postgresql+asyncpg://dev@localhost/amm", "shard1": "postgresql+asyncpg://dev@localhost/amm1"}
+    registry = ShardRegistry(urls, "default", create_async_engine(urls["default"]))
+    directory = FakeDirectory({TENANT: ("shard1", ACTIVE)})
+    monkeypatch.setattr(sharding, "shard_registry", registry)
+    monkeypatch.setattr(sharding, "shard_directory", directory)
+    return registry, directory
+
+
+def test_route_session_binds_unused_session(shards):
+    registry, _ = shards
+
+    async def run():
+        session = AsyncSession(bind=registry.engine("default"))
+        assert await route_session(session, TENANT) == "shard1"
+        assert session.bind is registry.engine("shard1")
+        assert session.sync_session.bind is registry.engine("shard1").sync_engine
+        assert session.info["shard"] == "shard1"
+
+    asyncio.run(run())
+
+
+def test_route_session_refuses_mid_transaction(shards):
+    registry, _ = shards
+
+    async def run():
+        session = AsyncSession(bind=registry.engine("default"))
+        await session.begin()
+        with pytest.raises(RuntimeError):
+            await route_session(session, TENANT)
+        assert session.bind is registry.engine("default")
+
+    asyncio.run(run())
+
+
+def test_route_session_same_shard_is_noop_mid_transaction(shards):
+    registry, _ = shards
+
+    async def run():
+        session = AsyncSession(bind=registry.engine("default"))
+        await route_session(session, TENANT)
+        await session.begin()
+        assert await route_session(session, TENANT) == "shard1"
+
+    asyncio.run(run())
+
+
+def test_route_session_refuses_moving_tenant(shards):
+    registry, directory = shards
+    directory.entries[TENANT] = ("shard1", MOVING)
+
+    async def run():
+        session = AsyncSession(bind=registry.engine("default"))
+        with pytest.raises(TenantMovingError):
+            await route_session(session, TENANT)
+        assert "shard" not in session.info
+
+    asyncio.run(run())
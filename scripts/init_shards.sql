@@ -0,0 +1,4 @@
+-- Extra shard databases for local development.
+-- Runs once, when the db volume is first initialised; on an existing volume run:
+--   docker compose exec db createdb -U dev amm_shard1
+CREATE DATABASE amm_shard1 OWNER dev;
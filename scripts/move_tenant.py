@@ -0,0 +1,274 @@
+"""Move a tenant to another shard while the API stays up.
+Run with:  python scripts/move_tenant.py <tenant_id> <target_shard>
+
+Steps:
+  1. flag the tenant `moving` in the directory; its requests get 503 while
+     other tenants are unaffected,
+  2. wait for directory caches and in-flight requests to drain,
+  3. copy every tenant row to the target shard in one transaction,
+  4. point the directory at the target shard (cut-over),
+  5. delete the tenant from the source shard (unless --keep-source).
+On failure before cut-over the tenant is re-activated on its source shard;
+if the cut-over itself keeps failing, manual recovery steps are printed.
+The tenant is unavailable for the drain plus the copy, and instances pick up
+the cut-over within SHARD_DIRECTORY_MOVING_CACHE_SECONDS.
+Integer ids (roles, actions_log) are re-allocated on the target shard;
+permissions are matched by code. Users holding a role the tenant does not own
+abort the copy.
+"""
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import get_settings
+from app.core.sharding import shard_directory, shard_registry
+from app.models.models import (
+    ActionLog,
+    Dossier,
+    File,
+    FileVersion,
+    Module,
+    Permission,
+    Role,
+    RolePermission,
+    Tenant,
+    TenantShardStatusEnum,
+    User,
+)
+
+settings = get_settings()
+
+tenants = Tenant.__table__
+roles = Role.__table__
+permissions = Permission.__table__
+role_permissions = RolePermission.__table__
+users = User.__table__
+dossiers = Dossier.__table__
+modules = Module.__table__
+files = File.__table__
+file_versions = FileVersion.__table__
+actions_log = ActionLog.__table__
+
+
+async def _rows(conn: AsyncConnection, stmt) -> list[dict]:
+    return [dict(row._mapping) for row in (await conn.execute(stmt)).all()]
+
+
+async def _insert(conn: AsyncConnection, table, rows: list[dict]) -> None:
+    if rows:
+        await conn.execute(insert(table), rows)
+
+
+async def copy_tenant(src: AsyncConnection, dst: AsyncConnection, tenant_id: uuid.UUID) -> dict[str, int]:
+    """Copy all rows of a tenant from `src` to `dst`; returns row counts per table."""
+    user_ids = select(users.c.id).where(users.c.tenant_id == tenant_id)
+    dossier_ids = select(dossiers.c.id).where(dossiers.c.tenant_id == tenant_id)
+    module_ids = select(modules.c.id).where(modules.c.dossier_id.in_(dossier_ids))
+    file_ids = select(files.c.id).where(files.c.module_id.in_(module_ids))
+    counts: dict[str, int] = {}
+
+    # Users may only hold the tenant's own roles: shared roles (tenant_id NULL
+    # or another tenant's) have no counterpart on the target shard.
+    foreign_roles = await _rows(
+        src,
+        select(users.c.id, users.c.role_id)
+        .join(roles, roles.c.id == users.c.role_id)
+        .where(users.c.tenant_id == tenant_id, roles.c.tenant_id.is_distinct_from(tenant_id)),
+    )
+    if foreign_roles:
+        pairs = ", ".join(f"{r['id']} → {r['role_id']}" for r in foreign_roles)
+        raise ValueError(
+            f"Users of tenant {tenant_id} hold roles it does not own (user → role: {pairs}); "
+            "reassign them to tenant roles before moving"
+        )
+
+    tenant_rows = await _rows(src, select(tenants).where(tenants.c.id == tenant_id))
+    if not tenant_rows:
+        raise ValueError(f"Tenant {tenant_id} not found on source shard")
+    await _insert(dst, tenants, tenant_rows)
+    counts["tenants"] = len(tenant_rows)
+
+    # Roles: serial ids may collide on the target shard, so let it allocate new ones.
+    role_map: dict[int, int] = {}
+    for row in await _rows(src, select(roles).where(roles.c.tenant_id == tenant_id)):
+        old_id = row.pop("id")
+        role_map[old_id] = (await dst.execute(insert(roles).values(**row).returning(roles.c.id))).scalar_one()
+    counts["roles"] = len(role_map)
+
+    # Permissions are a global catalogue: upsert by code and map ids.
+    link_rows = await _rows(src, select(role_permissions).where(role_permissions.c.role_id.in_(list(role_map))))
+    permission_map: dict[int, int] = {}
+    perm_rows = await _rows(
+        src, select(permissions).where(permissions.c.id.in_([r["permission_id"] for r in link_rows]))
+    )
+    for row in perm_rows:
+        await dst.execute(
+            pg_insert(permissions)
+            .values(code=row["code"], description=row["description"])
+            .on_conflict_do_nothing(index_elements=[permissions.c.code])
+        )
+        permission_map[row["id"]] = (
+            await dst.execute(select(permissions.c.id).where(permissions.c.code == row["code"]))
+        ).scalar_one()
+    await _insert(dst, role_permissions, [
+        {"role_id": role_map[r["role_id"]], "permission_id": permission_map[r["permission_id"]]}
+        for r in link_rows
+    ])
+    counts["role_permissions"] = len(link_rows)
+
+    user_rows = await _rows(src, select(users).where(users.c.tenant_id == tenant_id))
+    for row in user_rows:
+        if row["role_id"] is not None:
+            row["role_id"] = role_map[row["role_id"]]
+    await _insert(dst, users, user_rows)
+    counts["users"] = len(user_rows)
+
+    dossier_rows = await _rows(src, select(dossiers).where(dossiers.c.tenant_id == tenant_id))
+    await _insert(dst, dossiers, dossier_rows)
+    counts["dossiers"] = len(dossier_rows)
+
+    module_rows = await _rows(src, select(modules).where(modules.c.id.in_(module_ids)))
+    await _insert(dst, modules, module_rows)
+    counts["modules"] = len(module_rows)
+
+    # files <-> file_versions reference each other: insert files first, then
+    # versions, then restore files.current_version_id.
+    file_rows = await _rows(src, select(files).where(files.c.id.in_(file_ids)))
+    current_versions = [
+        {"_file_id": r["id"], "_version_id": r["current_version_id"]}
+        for r in file_rows
+        if r["current_version_id"] is not None
+    ]
+    await _insert(dst, files, [{**r, "current_version_id": None} for r in file_rows])
+    counts["files"] = len(file_rows)
+
+    version_rows = await _rows(src, select(file_versions).where(file_versions.c.file_id.in_(file_ids)))
+    await _insert(dst, file_versions, version_rows)
+    counts["file_versions"] = len(version_rows)
+
+    if current_versions:
+        await dst.execute(
+            update(files)
+            .where(files.c.id == bindparam("_file_id"))
+            .values(current_version_id=bindparam("_version_id")),
+            current_versions,
+        )
+
+    log_rows = await _rows(src, select(actions_log).where(actions_log.c.user_id.in_(user_ids)))
+    for row in log_rows:
+        row.pop("id")
+    await _insert(dst, actions_log, log_rows)
+    counts["actions_log"] = len(log_rows)
+
+    return counts
+
+
+async def purge_tenant(conn: AsyncConnection, tenant_id: uuid.UUID) -> None:
+    """Delete a tenant from a shard.
+
+    Children go first: actions_log, files.uploaded_by and dossiers.created_by
+    reference users without ON DELETE, so a bare cascade from `tenants` fails.
+    """
+    user_ids = select(users.c.id).where(users.c.tenant_id == tenant_id)
+    dossier_ids = select(dossiers.c.id).where(dossiers.c.tenant_id == tenant_id)
+    module_ids = select(modules.c.id).where(modules.c.dossier_id.in_(dossier_ids))
+    file_ids = select(files.c.id).where(files.c.module_id.in_(module_ids))
+    await conn.execute(delete(actions_log).where(actions_log.c.user_id.in_(user_ids)))
+    await conn.execute(update(files).where(files.c.id.in_(file_ids)).values(current_version_id=None))
+    await conn.execute(delete(file_versions).where(file_versions.c.file_id.in_(file_ids)))
+    await conn.execute(delete(files).where(files.c.id.in_(file_ids)))
+    await conn.execute(delete(dossiers).where(dossiers.c.tenant_id == tenant_id))  # cascades modules
+    await conn.execute(delete(tenants).where(tenants.c.id == tenant_id))  # cascades users, roles
+
+
+async def cut_over(tenant_id: uuid.UUID, source: str, target: str, attempts: int = 5) -> None:
+    """Point the directory at `target`; the data is already committed there."""
+    for attempt in range(1, attempts + 1):
+        try:
+            await shard_directory.assign(tenant_id, target)
+            return
+        except Exception as exc:
+            print(f"Cut-over attempt {attempt}/{attempts} failed: {exc!r}")
+            if attempt < attempts:
+                await asyncio.sleep(2 ** attempt)
+    raise SystemExit(
+        f"""✘ Tenant {tenant_id} is copied to {target!r} but the directory still points at {source!r}
+(status `moving`, so its requests get 503). Recover by hand on the default shard:
+
+    UPDATE tenant_shards SET shard = '{target}', status = 'active', updated_at = now()
+    WHERE tenant_id = '{tenant_id}';
+
+then delete the stale copy on {source!r} with purge_tenant(). Or, to keep the tenant on
+{source!r}, purge {target!r} instead and set status = 'active' without changing the shard."""
+    )
+
+
+async def move_tenant(tenant_id: uuid.UUID, target: str, drain_seconds: float, keep_source: bool) -> None:
+    source, status = await shard_directory.lookup(tenant_id, use_cache=False)
+    if status is not TenantShardStatusEnum.active:
+        raise SystemExit(f"Tenant {tenant_id} is already being moved (directory status: {status.value}).")
+    if source == target:
+        print(f"Tenant {tenant_id} already lives on shard {target!r}. Nothing to do.")
+        return
+    target_engine = shard_registry.engine(target)  # fail fast on unknown shard
+    source_engine = shard_registry.engine(source)
+
+    await shard_directory.assign(tenant_id, source, TenantShardStatusEnum.moving)
+    try:
+        print(f"Tenant flagged as moving; draining for {drain_seconds:g}s...")
+        await asyncio.sleep(drain_seconds)
+        async with source_engine.connect() as src, target_engine.begin() as dst:
+            counts = await copy_tenant(src, dst, tenant_id)
+    except BaseException:
+        await shard_directory.assign(tenant_id, source)
+        raise
+    await cut_over(tenant_id, source, target)
+    print(f"✔ Tenant {tenant_id} moved {source!r} → {target!r}: "
+          + ", ".join(f"{table}={n}" for table, n in counts.items()))
+
+    if not keep_source:
+        try:
+            async with source_engine.begin() as src:
+                await purge_tenant(src, tenant_id)
+        except Exception as exc:
+            raise SystemExit(
+                f"✘ Tenant {tenant_id} now lives on {target!r}, but deleting the stale copy on {source!r} "
+                f"failed ({exc!r}). Requests and logins follow the directory and ignore that copy, "
+                f"but it holds stale data; retry purge_tenant() on {source!r}."
+            )
+        print(f"✔ Source copy on {source!r} deleted.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tenant_id", type=uuid.UUID)
+    parser.add_argument("target_shard", choices=list(settings.shard_urls))
+    parser.add_argument(
+        "--drain-seconds",
+        type=float,
+        default=settings.SHARD_DIRECTORY_CACHE_SECONDS,
+        help="wait after flagging the tenant, at least the directory cache TTL (default: %(default)s)",
+    )
+    parser.add_argument("--keep-source", action="store_true", help="leave the tenant's rows on the source shard")
+    args = parser.parse_args()
+    if args.drain_seconds < settings.SHARD_DIRECTORY_CACHE_SECONDS:
+        parser.error(
+            f"--drain-seconds must be at least SHARD_DIRECTORY_CACHE_SECONDS "
+            f"({settings.SHARD_DIRECTORY_CACHE_SECONDS}), or instances may still write to the source shard"
+        )
+
+    async def run() -> None:
+        try:
+            await move_tenant(args.tenant_id, args.target_shard, args.drain_seconds, args.keep_source)
+        finally:
+            await shard_registry.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()